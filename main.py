@@ -1,10 +1,17 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Path, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Path, Body, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from enum import Enum
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+import orjson
+from bson.errors import InvalidId
+from pydantic import ValidationError
+from pymongo.errors import PyMongoError
 # Ensure PyJWT is imported
 import jwt
 
@@ -12,12 +19,46 @@ import jwt
 from models import (
     User, Profile, Transaction, Transactions, InventoryItem, Book, 
     Message, Bus, BusRoute, Course, Timetable, SystemLog, Settings, 
-    Logout, ProfileSettings, UserRole, PyObjectId
+    Logout, ProfileSettings, UserRole, PyObjectId, USER_LIST, TRANSACTION_LIST
 )
 import services
 
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson; ObjectIds and other unknown types are stringified
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONRequest(Request):
+    """
+    Request whose JSON body is decoded with orjson instead of the stdlib json module
+    """
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+class ORJSONRoute(APIRoute):
+    """
+    Route that hands ORJSONRequest to FastAPI's body parsing
+    """
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def orjson_route_handler(request: Request):
+            return await handler(ORJSONRequest(request.scope, request.receive))
+
+        return orjson_route_handler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await services.ensure_indexes()
+    yield
+
 # Create FastAPI app
-app = FastAPI(title="School Management System API")
+app = FastAPI(title="School Management System API", default_response_class=ORJSONResponse, lifespan=lifespan)
+app.router.route_class = ORJSONRoute
 
 
 # Add this right after creating your FastAPI app
@@ -28,6 +69,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Exception handlers: endpoints let errors propagate and are mapped to a status code here
+@app.exception_handler(ValidationError)
+async def validation_error_handler(request: Request, exc: ValidationError):
+    return ORJSONResponse(status_code=422, content={"detail": exc.errors(include_url=False)})
+
+@app.exception_handler(ValueError)
+@app.exception_handler(KeyError)
+@app.exception_handler(InvalidId)
+async def bad_request_handler(request: Request, exc: Exception):
+    return ORJSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(PyMongoError)
+@app.exception_handler(Exception)
+async def server_error_handler(request: Request, exc: Exception):
+    return ORJSONResponse(status_code=500, content={"detail": str(exc)})
+
 # Authentication Dependency
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -37,54 +94,48 @@ async def get_dashboard_metrics():
     """
     Retrieve comprehensive dashboard metrics
     """
-    try:
-        metrics = await services.get_dashboard_metrics()
-        return metrics
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    metrics = await services.get_dashboard_metrics()
+    return metrics
 
 # 2. Student Management Endpoints
-@app.get("/students", response_model=List[Dict[str, Any]])
+@app.get("/students")
 async def list_students(
     skip: int = Query(0, ge=0), 
     limit: int = Query(100, ge=1, le=1000),
-    filters: Optional[Dict[str, Any]] = None
+    filters: Optional[str] = Query(None, description="JSON object of additional MongoDB filters"),
+    fields: Optional[List[str]] = Query(None, description="Only return these fields"),
+    after_id: Optional[str] = Query(None, description="Return documents after this ID; cheaper than skip for deep pages")
 ):
     """
     List students with optional filtering and pagination
     """
-    try:
-        students = await services.list_students(skip, limit, filters)
-        return [student.dict() for student in students]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    parsed_filters = orjson.loads(filters) if filters else None
+    if parsed_filters is not None and not isinstance(parsed_filters, dict):
+        raise ValueError("filters must be a JSON object")
+    students = await services.list_students(skip, limit, parsed_filters, fields, after_id)
+    # With a projection, unfetched fields would otherwise be reported as their model defaults
+    return ORJSONResponse(USER_LIST.dump_python(students, exclude_unset=bool(fields)))
 
 @app.post("/students")
 async def add_student(student_data: dict):
     """
     Add a new student to the system
     """
-    try:
-        student_id = await services.add_student(student_data)
-        return {"student_id": student_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    student_id = await services.add_student(student_data)
+    return {"student_id": student_id}
 
 @app.put("/students/{student_id}")
 async def update_student(
     student_id: str = Path(..., description="Student ID"),
-    update_data: dict = {}
+    update_data: Dict[str, Any] = Body(...)
 ):
     """
     Update existing student information
     """
-    try:
-        success = await services.update_student(student_id, update_data)
-        if not success:
-            raise HTTPException(status_code=404, detail="Student not found")
-        return {"message": "Student updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    success = await services.update_student(student_id, update_data)
+    if not success:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return {"message": "Student updated successfully"}
 
 @app.delete("/students/{student_id}")
 async def delete_student(
@@ -94,13 +145,10 @@ async def delete_student(
     """
     Delete or archive a student record
     """
-    try:
-        success = await services.delete_student(student_id, archive)
-        if not success:
-            raise HTTPException(status_code=404, detail="Student not found")
-        return {"message": "Student deleted/archived successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    success = await services.delete_student(student_id, archive)
+    if not success:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return {"message": "Student deleted/archived successfully"}
 
 # 3. Payroll Management Endpoints
 @app.get("/payroll")
@@ -111,118 +159,94 @@ async def list_current_payroll(
     """
     List upcoming payroll information
     """
-    try:
-        payroll_data = await services.list_current_payroll(skip, limit)
-        return [pay.dict() for pay in payroll_data]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    payroll_data = await services.list_current_payroll(skip, limit)
+    return ORJSONResponse(TRANSACTION_LIST.dump_python(payroll_data))
 
 @app.post("/payroll/process")
-async def process_payroll(period: datetime = datetime.utcnow()):
+async def process_payroll(period: datetime = Query(default_factory=lambda: datetime.now(timezone.utc))):
     """
     Process payroll for a specific period
     """
-    try:
-        processed_count = await services.process_payroll(period)
-        return {"message": f"Processed payroll for {processed_count} employees"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    processed_count = await services.process_payroll(period)
+    return {"message": f"Processed payroll for {processed_count} employees"}
 
 # 4. Employee Management Endpoints
 @app.get("/employees")
 async def list_employees(
     role: Optional[str] = Query(None),
     skip: int = Query(0, ge=0), 
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[List[str]] = Query(None, description="Only return these fields"),
+    after_id: Optional[str] = Query(None, description="Return documents after this ID; cheaper than skip for deep pages")
 ):
     """
     List employees with optional role filtering
     """
-    try:
-        employees = await services.list_employees(role, skip, limit)
-        return [emp.dict() for emp in employees]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    employees = await services.list_employees(role, skip, limit, fields, after_id)
+    # With a projection, unfetched fields would otherwise be reported as their model defaults
+    return ORJSONResponse(USER_LIST.dump_python(employees, exclude_unset=bool(fields)))
 
 @app.post("/employees")
 async def add_employee(employee_data: dict):
     """
     Add a new employee
     """
-    try:
-        employee_id = await services.add_employee(employee_data)
-        return {"employee_id": employee_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    employee_id = await services.add_employee(employee_data)
+    return {"employee_id": employee_id}
 
 @app.put("/employees/{employee_id}")
 async def update_employee(
     employee_id: str = Path(..., description="Employee ID"),
-    update_data: dict = {}
+    update_data: Dict[str, Any] = Body(...)
 ):
     """
     Update employee information
     """
-    try:
-        success = await services.update_employee(employee_id, update_data)
-        if not success:
-            raise HTTPException(status_code=404, detail="Employee not found")
-        return {"message": "Employee updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    success = await services.update_employee(employee_id, update_data)
+    if not success:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return {"message": "Employee updated successfully"}
 
 # 5. Transactions Management Endpoints
 @app.post("/transactions")
-async def create_transaction(transaction_data: dict):
+async def create_transaction(transaction_data: Transaction):
     """
     Create a new financial transaction
     """
-    try:
-        transaction_id = await services.create_transaction(transaction_data)
-        return {"transaction_id": transaction_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    transaction_id = await services.create_transaction(transaction_data.model_dump(exclude={"id"}))
+    return {"transaction_id": transaction_id}
 
 @app.get("/financial/summary")
 async def get_financial_summary():
     """
     Retrieve comprehensive financial summary
     """
-    try:
-        summary = await services.get_financial_summary()
-        return summary
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    summary = await services.get_financial_summary()
+    return summary
 
 # 6. Inventory Management Endpoint
 @app.post("/inventory/{action}")
 async def manage_inventory_item(
     action: str = Path(..., description="Action to perform"),
-    item_data: dict = {}
+    item_data: Dict[str, Any] = Body(...)
 ):
     """
     Manage inventory items (create/update/delete)
     """
-    try:
-        result = await services.manage_inventory_item(action, item_data)
-        return {"success": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    result = await services.manage_inventory_item(action, item_data)
+    return {"success": result}
 
 # 7. E-Library Management Endpoint
 @app.post("/books/{action}")
 async def manage_book(
     action: str = Path(..., description="Action to perform"),
-    book_data: dict = {}
+    book_data: Dict[str, Any] = Body(...)
 ):
     """
     Manage e-library books (create/update/delete)
     """
-    try:
-        result = await services.manage_book(action, book_data)
-        return {"success": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    result = await services.manage_book(action, book_data)
+    return {"success": result}
 
 # 8. Messaging Endpoint
 @app.post("/messages/send")
@@ -230,65 +254,54 @@ async def send_mass_message(message_data: dict):
     """
     Send mass SMS or email messages
     """
-    try:
-        message_id = await services.send_mass_message(message_data)
-        return {"message_id": message_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    message_id = await services.send_mass_message(message_data)
+    return {"message_id": message_id}
 
 # 9. Transportation Management Endpoint
 @app.post("/buses/{action}")
 async def manage_bus(
     action: str = Path(..., description="Action to perform"),
-    bus_data: dict = {}
+    bus_data: Dict[str, Any] = Body(...)
 ):
     """
     Manage school buses (create/update/delete)
     """
-    try:
-        result = await services.manage_bus(action, bus_data)
-        return {"success": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    result = await services.manage_bus(action, bus_data)
+    return {"success": result}
 
 # 10. Academics Management Endpoint
 @app.post("/courses/{action}")
 async def manage_course(
     action: str = Path(..., description="Action to perform"),
-    course_data: dict = {}
+    course_data: Dict[str, Any] = Body(...)
 ):
     """
     Manage academic courses (create/update/delete)
     """
-    try:
-        result = await services.manage_course(action, course_data)
-        return {"success": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    result = await services.manage_course(action, course_data)
+    return {"success": result}
 
 # 11. System Logging Endpoint
 @app.post("/system/log")
-async def log_system_event(log_data: dict):
+async def log_system_event(log_data: SystemLog):
     """
     Log system events
     """
-    try:
-        log_id = await services.log_system_event(log_data)
-        return {"log_id": log_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    log_id = await services.log_system_event(log_data.model_dump(exclude={"id"}))
+    return {"log_id": log_id}
 
 # 12. System Settings Endpoint
 @app.put("/system/settings")
-async def update_system_settings(settings_data: dict):
+async def update_system_settings(settings_data: Settings):
     """
     Update system-wide settings
     """
-    try:
-        success = await services.update_system_settings(settings_data)
-        return {"success": success}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # BSON has no date-only type, so the academic year dates are stored as ISO strings.
+    # exclude_unset: only the keys the client sent are $set; stored values it omitted are left alone
+    success = await services.update_system_settings(
+        settings_data.model_dump(mode="json", exclude={"id"}, exclude_unset=True)
+    )
+    return {"success": success}
 
 # 13. Logout Endpoint
 @app.post("/logout/{user_id}")
@@ -296,28 +309,22 @@ async def handle_user_logout(user_id: str):
     """
     Handle user logout
     """
-    try:
-        logout_id = await services.handle_user_logout(user_id)
-        return {"logout_id": logout_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    logout_id = await services.handle_user_logout(user_id)
+    return {"logout_id": logout_id}
 
 # 14. Profile Management Endpoint
 @app.put("/update/profile/{user_id}")
 async def update_user_profile(
     user_id: str = Path(..., description="User ID"),
-    profile_data: dict = {}
+    profile_data: Dict[str, Any] = Body(...)
 ):
     """
     Update user profile settings
     """
-    try:
-        success = await services.update_user_profile(user_id, profile_data)
-        if not success:
-            raise HTTPException(status_code=404, detail="User profile not found")
-        return {"message": "Profile updated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    success = await services.update_user_profile(user_id, profile_data)
+    if not success:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return {"message": "Profile updated successfully"}
 
 # Internal function to get current user
 async def get_current_user(token: str = Depends(oauth2_scheme)):
@@ -330,7 +337,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = await services.verify_access_token(token)
+        payload = services.verify_access_token(token)
         if payload is None:
             raise credentials_exception
         user_id: str = payload.get("sub")
@@ -353,13 +360,10 @@ async def register_user(
     """
     Register a new user with specific role
     """
-    try:
-        # Ensure role matches the path parameter
-        user_data['role'] = role
-        user_id = await services.create_user(user_data)
-        return {"user_id": user_id, "message": f"{role.capitalize()} registered successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # Ensure role matches the path parameter
+    user_data['role'] = role
+    user_id = await services.create_user(user_data)
+    return {"user_id": user_id, "message": f"{role.capitalize()} registered successfully"}
 
 # Enhanced Login Endpoint with Token Generation
 @app.post("/token")
@@ -367,43 +371,42 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     User authentication endpoint with JWT token generation
     """
-    try:
-        auth_result = await services.authenticate_user(form_data.username, form_data.password)
-        if not auth_result:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect username or password",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
+    auth_result = await services.authenticate_user(form_data.username, form_data.password)
+    if not auth_result:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
         
-        return {
-            "access_token": auth_result['access_token'], 
-            "token_type": "bearer",
-            "user_role": auth_result['user'].role
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "access_token": auth_result['access_token'], 
+        "token_type": "bearer",
+        "user_role": auth_result['user'].role
+    }
 
 # List Users by Role
 @app.get("/users/{role}")
 async def list_users_by_role(
-    role: str,
+    role: UserRole,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[List[str]] = Query(None, description="Only return these fields"),
+    after_id: Optional[str] = Query(None, description="Return documents after this ID; cheaper than skip for deep pages"),
     current_user: User = Depends(get_current_user)
 ):
     """
     List users by role with authentication
     """
-    try:
-        # Optional: Add role-based access control
-        if current_user.role not in ["ADMIN", "SUPPORT_STAFF"]:
-            raise HTTPException(status_code=403, detail="Not authorized")
+    # Optional: Add role-based access control
+    if current_user.role not in ["ADMIN", "SUPPORT_STAFF"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
         
-        users = await services.list_users_by_role(role, skip, limit)
-        return [user.dict() for user in users]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    users = await services.list_users_by_role(
+        role, skip, limit, tuple(fields) if fields else None, after_id
+    )
+    # With a projection, unfetched fields would otherwise be reported as their model defaults
+    return ORJSONResponse(USER_LIST.dump_python(users, exclude_unset=bool(fields)))
 
 # Get Current User Profile
 @app.get("/me")
@@ -411,7 +414,7 @@ async def get_current_user_profile(current_user: User = Depends(get_current_user
     """
     Get current authenticated user's profile
     """
-    return current_user.dict()
+    return ORJSONResponse(current_user.model_dump())
 
 @app.get("/")
 async def home():
@@ -1,50 +1,107 @@
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, EmailStr, HttpUrl, field_validator, ConfigDict
-from datetime import date, datetime, time
+from typing import Annotated, List, Literal, Optional, Dict, Any, Tuple
+from pydantic import AliasChoices, BaseModel, Field, StringConstraints, ConfigDict, TypeAdapter, computed_field
+from datetime import date, datetime, time, timezone
 from enum import Enum
+from typing_extensions import TypedDict
 from bson import ObjectId
+from bson.errors import InvalidId
 from pydantic_core import core_schema
 
 
+# Plain-string email/URL fields: a length bound plus one regex checked inside pydantic-core,
+# instead of email-validator / the URL parser and the Url object they allocate
+Email = Annotated[str, StringConstraints(max_length=254, pattern=r'^[^@\s]+@[^@\s]+\.[^@\s]+$')]
+WebUrl = Annotated[str, StringConstraints(max_length=2048, pattern=r'^https?://')]
+# The length bound is checked before the regex, so oversized input fails without a regex run
+PhoneNumber = Annotated[str, StringConstraints(min_length=3, max_length=20, pattern=r'^\+?[0-9\s\-]+$')]
+
+
+def _utcnow() -> datetime:
+    """
+    Timezone-aware UTC timestamp for default factories (datetime.utcnow is naive and deprecated)
+    """
+    return datetime.now(timezone.utc)
+
+
+# Fixed-shape notification switches: validated as three named keys rather than an open Dict[str, bool]
+class NotificationChannels(TypedDict, total=False):
+    sms: bool
+    email: bool
+    push_notification: bool
+
+
+def _validate_object_id(v):
+    """
+    Coerce a value to ObjectId in a single pass; this is the whole validator behind PyObjectId
+    """
+    if isinstance(v, ObjectId):
+        return v
+    if isinstance(v, str):
+        # ObjectId() already checks the hex digits, so only the length is tested up front
+        if len(v) == 24:
+            try:
+                return ObjectId(v)
+            except InvalidId:
+                pass
+        raise ValueError("Invalid ObjectId")
+    raise ValueError("ObjectId or string expected")
+
+
 class PyObjectId:
     @classmethod
     def __get_pydantic_core_schema__(cls, _source_type, _handler):
-        return core_schema.union_schema([
-            core_schema.is_instance_schema(ObjectId),
-            core_schema.no_info_plain_validator_function(cls.validate),
-            core_schema.str_schema()
-        ])
+        return core_schema.no_info_plain_validator_function(
+            _validate_object_id,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                str, when_used='json', return_schema=core_schema.str_schema()
+            ),
+        )
 
-    @classmethod
-    def validate(cls, v):
-        if isinstance(v, ObjectId):
-            return v
-        if isinstance(v, str):
-            try:
-                return ObjectId(v)
-            except:
-                raise ValueError("Invalid ObjectId")
-        raise TypeError("ObjectId or string expected")
+    validate = staticmethod(_validate_object_id)
 
     @classmethod
     def __get_pydantic_json_schema__(cls, _core_schema, _handler):
         return {"type": "string"}
 
 
+# Field type for ObjectId values: typed as ObjectId, validated/serialized by PyObjectId's core schema
+ObjectIdField = Annotated[ObjectId, PyObjectId]
+
+
 class BaseModelWithId(BaseModel):
-    id: Optional[PyObjectId] = Field(default=None, alias="_id", validation_alias="id")
+    id: Optional[ObjectIdField] = Field(
+        default=None,
+        validation_alias=AliasChoices("_id", "id"),
+        serialization_alias="_id",
+    )
     
+    # ObjectIds serialize through PyObjectId's schema; datetime/date/time use pydantic-core's ISO output.
+    # defer_build: a model's core schema is built on first use, so models no route touches cost nothing at import.
+    # Request-body models (Transaction, SystemLog, Settings) opt out so FastAPI's adapters are ready at startup.
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
         populate_by_name=True,
-        json_encoders={
-            ObjectId: str,
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat(),
-            time: lambda v: v.isoformat(),
-        }
+        defer_build=True,
     )
 
+    @classmethod
+    def from_mongo(cls, doc: Dict[str, Any]):
+        """
+        Build a model from a trusted MongoDB document without re-running validation.
+        The document's `_id` is picked up through the field alias.
+        Only use this for documents written through the validated models: constraints
+        such as `amount >= 0` are assumed to have been enforced on insert.
+        """
+        return cls.model_construct(**doc)
+
+    @classmethod
+    def from_json(cls, raw: bytes):
+        """
+        Validate a raw JSON payload straight into a model; pydantic-core parses and
+        validates in one pass without building an intermediate dict.
+        """
+        return cls.__pydantic_validator__.validate_json(raw)
+
 
 class UserRole(str, Enum):
     ADMIN = "admin"
@@ -61,7 +118,7 @@ class User(BaseModelWithId):
         max_length=50,
         description="Unique username for the user"
     )
-    email: Optional[EmailStr] = Field(
+    email: Optional[Email] = Field(
         None,
         description="User's email address"
     )
@@ -104,66 +161,98 @@ class User(BaseModelWithId):
         description="Additional contact information"
     )
 
-    @field_validator('id', mode='before')
-    def validate_id(cls, v):
-        if v is None:
-            return None
-        return PyObjectId.validate(v)
+    @classmethod
+    def from_mongo(cls, doc: Dict[str, Any]):
+        """
+        Same as BaseModelWithId.from_mongo, but turns the stored role string into a UserRole
+        so the constructed model serializes without type mismatches
+        """
+        role = doc.get("role")
+        if isinstance(role, str) and not isinstance(role, UserRole):
+            try:
+                doc = {**doc, "role": UserRole(role)}
+            except ValueError:
+                # Leave an unknown stored role as-is; serializing it will warn
+                pass
+        return cls.model_construct(**doc)
 
 
 class Profile(BaseModelWithId):
-    user_id: PyObjectId
-    phone_number: Optional[str] = Field(None, pattern=r'^\+?[0-9\s\-]+$')
+    user_id: ObjectIdField
+    phone_number: Optional[PhoneNumber] = None
     address: Optional[str] = Field(None, max_length=200)
     date_of_birth: Optional[date] = None
-    profile_picture: Optional[HttpUrl] = None
+    profile_picture: Optional[WebUrl] = None
     emergency_contacts: List[Dict[str, str]] = Field(
         default_factory=list,
         max_length=5,
         description="List of emergency contacts (name, relationship, phone)"
     )
 
-    @field_validator('user_id', mode='before')
-    def validate_user_id(cls, v):
-        return PyObjectId.validate(v)
-
 
 class Transaction(BaseModelWithId):
-    user_id: PyObjectId
+    user_id: ObjectIdField
     amount: float = Field(ge=0)
     transaction_type: str = Field(min_length=2, max_length=50)
     description: str = Field(min_length=2, max_length=200)
-    date: datetime = Field(default_factory=datetime.utcnow)
+    date: datetime = Field(default_factory=_utcnow)
     category: str = Field(min_length=2, max_length=50)
     payment_method: str = Field(min_length=2, max_length=50)
     status: str = Field(default="completed", min_length=2, max_length=20)
     invoice_number: Optional[str] = Field(None, min_length=2, max_length=50)
 
-    @field_validator('user_id', mode='before')
-    def validate_user_id(cls, v):
-        return PyObjectId.validate(v)
+    model_config = ConfigDict(frozen=True, defer_build=False)
+
+
+class IncomeSource(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    amount: float = Field(ge=0)
+
+
+class ExpenseChannel(IncomeSource):
+    pass
 
 
 class Transactions(BaseModelWithId):
     total_income: float = Field(ge=0)
     total_expenses: float = Field(ge=0)
-    current_balance: float
-    income_sources: List[Dict[str, float]] = Field(default_factory=list)
-    expense_channels: List[Dict[str, float]] = Field(default_factory=list)
+    income_sources: List[IncomeSource] = Field(default_factory=list)
+    expense_channels: List[ExpenseChannel] = Field(default_factory=list)
     recent_transactions: List[Transaction] = Field(default_factory=list)
 
+    @classmethod
+    def from_mongo(cls, doc: Dict[str, Any]):
+        """
+        Construct the embedded entries too, so nested documents are not left as plain dicts
+        """
+        doc = dict(doc)
+        doc["income_sources"] = [IncomeSource.model_construct(**s) for s in doc.get("income_sources", ())]
+        doc["expense_channels"] = [ExpenseChannel.model_construct(**e) for e in doc.get("expense_channels", ())]
+        doc["recent_transactions"] = [Transaction.from_mongo(t) for t in doc.get("recent_transactions", ())]
+        return cls.model_construct(**doc)
+
+    @computed_field
+    @property
+    def current_balance(self) -> float:
+        return self.total_income - self.total_expenses
+
 
 class InventoryItem(BaseModelWithId):
     name: str = Field(min_length=2, max_length=100)
     category: str = Field(min_length=2, max_length=50)
     quantity: int = Field(ge=0)
     unit_price: float = Field(ge=0)
-    total_value: float = Field(ge=0)
     reorder_point: int = Field(ge=0)
     supplier: Optional[str] = Field(None, min_length=2, max_length=100)
     last_restocked: Optional[date] = None
     sales_trend: Optional[List[float]] = None
 
+    # Derived rather than stored; a plain property stays correct if quantity/unit_price change
+    @computed_field
+    @property
+    def total_value(self) -> float:
+        return self.quantity * self.unit_price
+
 
 class Book(BaseModelWithId):
     title: str = Field(min_length=1, max_length=200)
@@ -172,104 +261,80 @@ class Book(BaseModelWithId):
     category: str = Field(min_length=2, max_length=50)
     available_copies: int = Field(ge=0)
     total_copies: int = Field(ge=0)
-    download_link: Optional[HttpUrl] = None
+    download_link: Optional[WebUrl] = None
     publisher: Optional[str] = Field(None, min_length=2, max_length=100)
     is_borrowed: bool = False
 
 
 class Message(BaseModelWithId):
-    sender_id: PyObjectId
-    recipients: List[PyObjectId]
+    sender_id: ObjectIdField
+    recipients: List[ObjectIdField]
     subject: str = Field(min_length=1, max_length=100)
     body: str = Field(min_length=1)
-    channel: str = Field(pattern="^(SMS|Email)$")
-    sent_at: datetime = Field(default_factory=datetime.utcnow)
-    status: str = Field(default="sent", pattern="^(sent|delivered|read|failed)$")
+    channel: Literal['SMS', 'Email']
+    sent_at: datetime = Field(default_factory=_utcnow)
+    status: Literal['sent', 'delivered', 'read', 'failed'] = 'sent'
     template_used: Optional[str] = Field(None, min_length=2, max_length=50)
     delivery_rate: Optional[float] = Field(None, ge=0, le=100)
     open_rate: Optional[float] = Field(None, ge=0, le=100)
 
-    @field_validator('sender_id', 'recipients', mode='before')
-    def validate_ids(cls, v):
-        if isinstance(v, list):
-            return [PyObjectId.validate(item) for item in v]
-        return PyObjectId.validate(v)
-
 
 class Bus(BaseModelWithId):
     name: str = Field(min_length=2, max_length=50)
     number: str = Field(min_length=1, max_length=20)
     capacity: int = Field(gt=0)
-    driver_id: PyObjectId
-    current_route_id: PyObjectId
-    status: str = Field(default="active", pattern="^(active|maintenance|retired)$")
+    driver_id: ObjectIdField
+    current_route_id: ObjectIdField
+    status: Literal['active', 'maintenance', 'retired'] = 'active'
     last_maintenance: date
     next_maintenance_due: date
     maintenance_history: List[Dict[str, Any]] = Field(default_factory=list)
 
-    @field_validator('driver_id', 'current_route_id', mode='before')
-    def validate_ids(cls, v):
-        return PyObjectId.validate(v)
+    model_config = ConfigDict(frozen=True)
 
 
 class BusRoute(BaseModelWithId):
     name: str = Field(min_length=2, max_length=100)
     stops: List[str] = Field(min_length=1)
-    assigned_bus_id: PyObjectId
+    assigned_bus_id: ObjectIdField
     schedule: Dict[str, List[time]]
     total_students_route: int = Field(default=0, ge=0)
 
-    @field_validator('assigned_bus_id', mode='before')
-    def validate_bus_id(cls, v):
-        return PyObjectId.validate(v)
+    model_config = ConfigDict(frozen=True)
 
 
 class Course(BaseModelWithId):
     name: str = Field(min_length=2, max_length=100)
     code: str = Field(min_length=2, max_length=20)
     department: str = Field(min_length=2, max_length=50)
-    teacher_id: PyObjectId
-    students: List[PyObjectId] = Field(default_factory=list)
+    teacher_id: ObjectIdField
+    students: List[ObjectIdField] = Field(default_factory=list)
     schedule: Dict[str, Any] = Field(default_factory=dict)
     credits: int = Field(gt=0)
     semester: str = Field(min_length=2, max_length=20)
     grade_scale: Dict[str, Dict[str, float]] = Field(default_factory=dict)
 
-    @field_validator('teacher_id', 'students', mode='before')
-    def validate_ids(cls, v):
-        if isinstance(v, list):
-            return [PyObjectId.validate(item) for item in v]
-        return PyObjectId.validate(v)
-
 
 class Timetable(BaseModelWithId):
     grade: str = Field(min_length=1, max_length=20)
     day_of_week: int = Field(ge=0, le=6)
     start_time: time
     end_time: time
-    course_id: PyObjectId
+    course_id: ObjectIdField
     room: str = Field(min_length=1, max_length=20)
-    teacher_id: Optional[PyObjectId] = None
+    teacher_id: Optional[ObjectIdField] = None
 
-    @field_validator('course_id', 'teacher_id', mode='before')
-    def validate_ids(cls, v):
-        if v is None:
-            return None
-        return PyObjectId.validate(v)
+    model_config = ConfigDict(frozen=True, extra='forbid')
 
 
 class SystemLog(BaseModelWithId):
     timestamp: datetime
-    severity: str = Field(pattern="^(info|warning|error|critical)$")
+    severity: Literal['info', 'warning', 'error', 'critical']
     component: str = Field(min_length=2, max_length=50)
     message: str = Field(min_length=1)
-    user_id: Optional[PyObjectId] = None
+    user_id: Optional[ObjectIdField] = None
 
-    @field_validator('user_id', mode='before')
-    def validate_user_id(cls, v):
-        if v is None:
-            return None
-        return PyObjectId.validate(v)
+    model_config = ConfigDict(frozen=True, extra='forbid', defer_build=False)
 
 
 class Settings(BaseModelWithId):
@@ -281,34 +346,40 @@ class Settings(BaseModelWithId):
     timezone: str = Field(default="UTC", min_length=2, max_length=50)
     enable_online_payments: bool = False
     maintenance_mode: bool = False
-    notification_settings: Dict[str, bool] = Field(
-        default={"sms": True, "email": True}
+    # A factory builds the dict directly; a dict default would be deep-copied for every instance
+    notification_settings: NotificationChannels = Field(
+        default_factory=lambda: {"sms": True, "email": True}
     )
-    communication_channels: List[str] = Field(
-        default=["SMS", "Email"],
+    # Immutable default, shared by every instance instead of copied
+    communication_channels: Tuple[str, ...] = Field(
+        default=("SMS", "Email"),
         min_length=1
     )
 
+    model_config = ConfigDict(defer_build=False)
+
 
 class Logout(BaseModelWithId):
-    user_id: PyObjectId
-    logout_time: datetime = Field(default_factory=datetime.utcnow)
+    user_id: ObjectIdField
+    logout_time: datetime = Field(default_factory=_utcnow)
     session_duration: Optional[int] = Field(None, ge=0)
 
-    @field_validator('user_id', mode='before')
-    def validate_user_id(cls, v):
-        return PyObjectId.validate(v)
+    model_config = ConfigDict(frozen=True, extra='forbid')
 
 
 class ProfileSettings(BaseModelWithId):
-    user_id: PyObjectId
+    user_id: ObjectIdField
     language_preference: str = Field(default="English", min_length=2, max_length=50)
-    notification_settings: Dict[str, bool] = Field(
-        default={"email": True, "sms": False, "push_notification": False}
+    notification_settings: NotificationChannels = Field(
+        default_factory=lambda: {"email": True, "sms": False, "push_notification": False}
     )
     two_factor_authentication: bool = False
     theme: str = Field(default="default", min_length=2, max_length=20)
 
-    @field_validator('user_id', mode='before')
-    def validate_user_id(cls, v):
-        return PyObjectId.validate(v)
\ No newline at end of file
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
+
+# List adapters built once at import; dumping a whole page through one adapter
+# replaces a per-item model_dump() loop in the list endpoints
+USER_LIST = TypeAdapter(List[User])
+TRANSACTION_LIST = TypeAdapter(List[Transaction])
@@ -1,94 +1,277 @@
 #services.py
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import AsyncMongoClient
+from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
 from bson import ObjectId
 import os
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 import logging
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import re
 from models import (
     User, Profile, Transaction, Transactions, InventoryItem, Book, 
     Message, Bus, BusRoute, Course, Timetable, SystemLog, Settings, 
     Logout, ProfileSettings, UserRole, PyObjectId
 )
-# Add these imports at the top of services.py
-from typing import Optional
 import jwt
-from datetime import datetime, timedelta
+from cachetools import TTLCache
+
+# Load environment variables
+load_dotenv()
 
 # Secret key for JWT token generation (in a real-world scenario, use a secure environment variable)
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Key bytes and algorithm list are prepared once instead of on every encode/decode
+_JWT_KEY = SECRET_KEY.encode() if SECRET_KEY else None
+_JWT_ALGORITHMS = [ALGORITHM]
+# Every accepted token must carry an expiry; the verify cache relies on it
+_JWT_DECODE_OPTIONS = {"require": ["exp"]}
+# Recently verified tokens -> payload, so a burst of requests with one token pays for one HMAC check
+_VERIFY_CACHE = TTLCache(maxsize=10_000, ttl=60)
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
-
-# Load environment variables
-load_dotenv()
+# The default format never shows thread/process details, so don't collect them for every record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 
 # MongoDB Configuration
 mongo_uri = os.environ.get("MONGODB_URI")
 database_name = os.environ.get("DATABASE_NAME")
-client = AsyncIOMotorClient(mongo_uri)
+# One client per process; its connection pool is shared by every request.
+# minPoolSize keeps warm connections so a burst doesn't pay connection setup, and
+# zstd (zlib as the fallback) compresses the wire protocol when the server supports it
+client = AsyncMongoClient(
+    mongo_uri,
+    maxPoolSize=200,
+    minPoolSize=20,
+    maxIdleTimeMS=60000,
+    waitQueueTimeoutMS=5000,
+    serverSelectionTimeoutMS=3000,
+    compressors="zstd,zlib",
+)
 db = client[database_name]
 
+
+# Password hashing: argon2id for new hashes, bcrypt still accepted for existing ones.
+# Both are CPU-bound, so they run on a dedicated pool instead of the event loop.
+_PW_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+_PASSWORD_HASHER = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def _verify_password_sync(stored_hash, password: str) -> bool:
+    # Accounts created before the argon2 switch hold bcrypt hashes (stored as bytes)
+    if isinstance(stored_hash, bytes) or stored_hash.startswith("$2"):
+        if isinstance(stored_hash, str):
+            stored_hash = stored_hash.encode()
+        return bcrypt.checkpw(password.encode(), stored_hash)
+    try:
+        return _PASSWORD_HASHER.verify(stored_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+async def _hash_password(password: str) -> str:
+    """
+    Hash a password with argon2id off the event loop
+    """
+    return await asyncio.get_running_loop().run_in_executor(_PW_POOL, _PASSWORD_HASHER.hash, password)
+
+async def _verify_password(stored_hash, password: str) -> bool:
+    """
+    Check a password against an argon2 or legacy bcrypt hash off the event loop
+    """
+    return await asyncio.get_running_loop().run_in_executor(_PW_POOL, _verify_password_sync, stored_hash, password)
+
+
+# Serves the role-filtered user lists, which page in _id order; those queries hint it explicitly
+_ROLE_ID_INDEX = [("role", 1), ("_id", 1)]
+
+async def ensure_indexes():
+    """
+    Create the indexes behind this module's query shapes; run once at application startup
+    (create_index is a no-op when the index already exists).
+    The unique username/email indexes cannot be built while the users collection holds
+    duplicate values; those must be resolved first or startup fails here.
+    """
+    try:
+        await asyncio.gather(
+            db.users.create_index([("role", 1), ("is_active", 1)]),
+            db.users.create_index(_ROLE_ID_INDEX),
+            # Unique only where set, so accounts without a username/email don't collide on null
+            db.users.create_index(
+                "username", unique=True, partialFilterExpression={"username": {"$type": "string"}}
+            ),
+            db.users.create_index(
+                "email", unique=True, partialFilterExpression={"email": {"$type": "string"}}
+            ),
+            db.transactions.create_index([("transaction_type", 1), ("date", -1)]),
+            db.messages.create_index("status"),
+            db.system_logs.create_index("severity"),
+        )
+    except DuplicateKeyError as e:
+        logger.error("Cannot create unique user indexes, duplicate usernames/emails exist: %s", e)
+        raise
+    except Exception as e:
+        logger.error("Error creating indexes: %s", e)
+        raise
+
+
+def _ttl_cache(ttl: int, maxsize: int = 128):
+    """
+    Cache an async service's result per positional-argument tuple for `ttl` seconds
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @functools.wraps(func)
+        async def wrapper(*args):
+            try:
+                return cache[args]
+            except KeyError:
+                pass
+            result = await func(*args)
+            cache[args] = result
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+async def _aggregate(collection, pipeline: List[Dict[str, Any]], length: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Run an aggregation pipeline and collect up to `length` result documents
+    (the async driver's aggregate() must be awaited before its cursor can be read)
+    """
+    cursor = await collection.aggregate(pipeline)
+    return await cursor.to_list(length)
+
+async def _sum_amount(transaction_type: str):
+    """
+    Total `amount` over the transactions of one type (0 when there are none)
+    """
+    result = await _aggregate(db.transactions, [
+        {"$match": {"transaction_type": transaction_type}},
+        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+    ], 1)
+    return result[0]["total"] if result else 0
+
+# Fields a User is built from, minus the password hash, which user reads never need to return
+USER_PROJECTION = {"_id": 1, **{name: 1 for name in User.model_fields if name not in ("id", "password")}}
+
+def _projection(fields: Optional[Sequence[str]]) -> Dict[str, int]:
+    """
+    Build a users find() projection from a list of field names; unknown fields (and
+    password) are ignored, and no usable field falls back to USER_PROJECTION
+    """
+    if fields:
+        projection = {field: 1 for field in fields if field in USER_PROJECTION}
+        if projection:
+            return projection
+    return USER_PROJECTION
+
+def _oid(value: Union[str, ObjectId]) -> ObjectId:
+    """
+    Return `value` as an ObjectId, parsing it only when it is not one already
+    """
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+def _page_query(query: Dict[str, Any], after_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Restrict a query to documents whose `_id` sorts after `after_id`
+    """
+    if after_id:
+        query["_id"] = {"$gt": _oid(after_id)}
+    return query
+
 # 1. Dashboard Services
+_STAFF_ROLES = ("admin", "teacher", "support")
+
+@_ttl_cache(ttl=60)
 async def get_dashboard_metrics():
     """
     Retrieve comprehensive dashboard metrics
     """
     try:
-        # Student Enrollment Metrics
-        total_students = await db.users.count_documents({"role": "student"})
-        
-        # Staff Metrics
-        staff_distribution = {
-            "admin": await db.users.count_documents({"role": "admin"}),
-            "teacher": await db.users.count_documents({"role": "teacher"}),
-            "support": await db.users.count_documents({"role": "support"})
-        }
-        
-        # Course Metrics
-        total_courses = await db.courses.count_documents({})
-        
-        # Financial Metrics
-        total_revenue = await db.transactions.aggregate([
-            {"$match": {"transaction_type": "income"}},
-            {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-        ]).to_list(1)
+        # The queries are independent, so they run concurrently: one round-trip of latency instead of one per query
+        (
+            total_students,
+            staff_counts,
+            total_courses,
+            total_revenue,
+            unread_notifications,
+            unread_messages,
+        ) = await asyncio.gather(
+            # Student Enrollment Metrics
+            db.users.count_documents({"role": "student"}),
+            # Staff Metrics: one grouped pass over the staff roles instead of a count per role
+            _aggregate(db.users, [
+                {"$match": {"role": {"$in": list(_STAFF_ROLES)}}},
+                {"$group": {"_id": "$role", "n": {"$sum": 1}}}
+            ], len(_STAFF_ROLES)),
+            # Course Metrics
+            db.courses.count_documents({}),
+            # Financial Metrics
+            _sum_amount("income"),
+            # Notifications and Messages
+            db.system_logs.count_documents({"severity": "unread"}),
+            db.messages.count_documents({"status": "unread"}),
+        )
         
-        # Notifications and Messages
-        unread_notifications = await db.system_logs.count_documents({"severity": "unread"})
-        unread_messages = await db.messages.count_documents({"status": "unread"})
+        staff_distribution = dict.fromkeys(_STAFF_ROLES, 0)
+        staff_distribution.update((doc["_id"], doc["n"]) for doc in staff_counts)
         
         return {
             "total_students": total_students,
             "staff_distribution": staff_distribution,
             "total_courses": total_courses,
-            "total_revenue": total_revenue[0]['total'] if total_revenue else 0,
+            "total_revenue": total_revenue,
             "unread_notifications": unread_notifications,
             "unread_messages": unread_messages
         }
     except Exception as e:
-        logger.error(f"Error retrieving dashboard metrics: {e}")
+        logger.error("Error retrieving dashboard metrics: %s", e)
         raise
 
-# 2. Student Management Services
-async def list_students(skip: int = 0, limit: int = 100, filters: dict = None):
+async def _insert_user(user_doc: Dict[str, Any]) -> str:
     """
-    List students with optional filtering and pagination
+    Insert a user document; the unique username/email indexes reject duplicates atomically
     """
-    query = filters or {}
+    try:
+        result = await db.users.insert_one(user_doc)
+    except DuplicateKeyError as e:
+        raise ValueError("Username or email already exists") from e
+    return str(result.inserted_id)
+
+# 2. Student Management Services
+async def list_students(
+    skip: int = 0,
+    limit: int = 100,
+    filters: dict = None,
+    fields: Optional[Sequence[str]] = None,
+    after_id: Optional[str] = None
+):
+    """
+    List students with optional filtering and pagination.
+    Prefer `after_id` (the last `_id` of the previous page) over `skip`: Mongo walks
+    and discards every skipped document, while the `_id` range is a single index seek.
+    `fields` limits the returned fields to the given names.
+    """
+    query = _page_query(filters or {}, after_id)
     query["role"] = "student"
     try:
-        students = await db.users.find(query).skip(skip).limit(limit).to_list(limit)
-        return [User(**student) for student in students]
+        students = await db.users.find(query, _projection(fields)).hint(_ROLE_ID_INDEX).sort("_id", 1).skip(skip).limit(limit).to_list(limit)
+        return [User.from_mongo(student) for student in students]
     except Exception as e:
-        logger.error(f"Error listing students: {e}")
+        logger.error("Error listing students: %s", e)
         raise
 
 async def add_student(student_data: Dict[str, Any]):
@@ -101,46 +284,45 @@ async def add_student(student_data: Dict[str, Any]):
         
         # Hash password
         if 'password' in student_data:
-            student_data['password'] = bcrypt.hashpw(student_data['password'].encode(), bcrypt.gensalt())
+            student_data['password'] = await _hash_password(student_data['password'])
         
         # Insert user
-        result = await db.users.insert_one(student_data)
-        return str(result.inserted_id)
+        return await _insert_user(student_data)
     except Exception as e:
-        logger.error(f"Error adding student: {e}")
+        logger.error("Error adding student: %s", e)
         raise
 
-async def update_student(student_id: str, update_data: Dict[str, Any]):
+async def update_student(student_id: Union[str, ObjectId], update_data: Dict[str, Any]):
     """
     Update existing student information
     """
     try:
         result = await db.users.update_one(
-            {"_id": ObjectId(student_id), "role": "student"},
+            {"_id": _oid(student_id), "role": "student"},
             {"$set": update_data}
         )
         return result.modified_count > 0
     except Exception as e:
-        logger.error(f"Error updating student: {e}")
+        logger.error("Error updating student: %s", e)
         raise
 
-async def delete_student(student_id: str, archive: bool = True):
+async def delete_student(student_id: Union[str, ObjectId], archive: bool = True):
     """
     Delete or archive a student record
     """
     try:
         if archive:
             result = await db.users.update_one(
-                {"_id": ObjectId(student_id), "role": "student"},
+                {"_id": _oid(student_id), "role": "student"},
                 {"$set": {"is_active": False}}
             )
         else:
             result = await db.users.delete_one(
-                {"_id": ObjectId(student_id), "role": "student"}
+                {"_id": _oid(student_id), "role": "student"}
             )
         return result.modified_count > 0 if archive else result.deleted_count > 0
     except Exception as e:
-        logger.error(f"Error deleting student: {e}")
+        logger.error("Error deleting student: %s", e)
         raise
 
 # 3. Payroll Management Services
@@ -152,57 +334,79 @@ async def list_current_payroll(skip: int = 0, limit: int = 100):
         payroll_data = await db.transactions.find({
             "transaction_type": "salary"
         }).skip(skip).limit(limit).to_list(limit)
-        return [Transaction(**pay) for pay in payroll_data]
+        return [Transaction.from_mongo(pay) for pay in payroll_data]
     except Exception as e:
-        logger.error(f"Error listing payroll: {e}")
+        logger.error("Error listing payroll: %s", e)
         raise
 
+# The constant part of every salary transaction; only the per-employee fields vary
+_PAYROLL_TEMPLATE = {
+    "transaction_type": "salary",
+    "category": "payroll",
+    "payment_method": "bank_transfer",
+    "status": "processed",
+    "invoice_number": None,
+}
+_PAYROLL_EMPLOYEES = {"is_active": True, "role": {"$in": ["teacher", "admin", "support"]}}
+# A salary is payable when numeric or unset/null (paid as 0). Anything else is filtered out before
+# the pipeline, since a failing $toDouble would abort the $merge after part of it was written
+_PAYABLE_SALARY = [{"salary": {"$type": "number"}}, {"salary": None}]
+_PAYROLL_PAYABLE = {**_PAYROLL_EMPLOYEES, "$or": _PAYABLE_SALARY}
+_PAYROLL_UNPAYABLE = {**_PAYROLL_EMPLOYEES, "$nor": _PAYABLE_SALARY}
+
 async def process_payroll(period: datetime):
     """
-    Process payroll for a specific period
+    Process payroll for a specific period.
+    The transactions are built and written by the server in one $merge pipeline,
+    so no employee documents are sent to the application.
     """
     try:
-        # Fetch all active employees
-        employees = await db.users.find({
-            "is_active": True, 
-            "role": {"$in": ["teacher", "admin", "support"]}
-        }).to_list(None)
-        
-        payroll_transactions = []
-        for employee in employees:
-            # Simplified salary calculation (would need more complex logic in real-world)
-            salary_transaction = Transaction(
-                user_id=employee['_id'],
-                amount=employee.get('salary', 0),
-                transaction_type="salary",
-                description=f"Salary for {period.strftime('%B %Y')}",
-                date=period,
-                category="payroll",
-                payment_method="bank_transfer",
-                status="processed"
-            )
-            payroll_transactions.append(salary_transaction)
-        
-        # Bulk insert payroll transactions
-        if payroll_transactions:
-            await db.transactions.insert_many([t.dict() for t in payroll_transactions])
-        
-        return len(payroll_transactions)
+        # Simplified salary calculation (would need more complex logic in real-world)
+        salary_transaction = {
+            "_id": 0,
+            "user_id": "$_id",
+            "amount": {"$toDouble": {"$ifNull": ["$salary", 0]}},
+            "description": {"$literal": f"Salary for {period.strftime('%B %Y')}"},
+            "date": {"$literal": period},
+            **{field: {"$literal": value} for field, value in _PAYROLL_TEMPLATE.items()},
+        }
+        processed, skipped, _ = await asyncio.gather(
+            db.users.count_documents(_PAYROLL_PAYABLE),
+            db.users.count_documents(_PAYROLL_UNPAYABLE),
+            _aggregate(db.users, [
+                {"$match": _PAYROLL_PAYABLE},
+                {"$project": salary_transaction},
+                {"$merge": {"into": "transactions", "whenMatched": "fail"}}
+            ])
+        )
+        if skipped:
+            logger.warning("Payroll skipped %s employees with a non-numeric salary", skipped)
+        return processed
     except Exception as e:
-        logger.error(f"Error processing payroll: {e}")
+        logger.error("Error processing payroll: %s", e)
         raise
 
 # 4. Employee Management Services
-async def list_employees(role: Optional[str] = None, skip: int = 0, limit: int = 100):
+async def list_employees(
+    role: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[Sequence[str]] = None,
+    after_id: Optional[str] = None
+):
     """
-    List employees with optional role filtering
+    List employees with optional role filtering, projection and `_id`-range pagination
     """
     try:
-        query = {"role": role} if role else {}
-        employees = await db.users.find(query).skip(skip).limit(limit).to_list(limit)
-        return [User(**emp) for emp in employees]
+        query = _page_query({"role": role} if role else {}, after_id)
+        cursor = db.users.find(query, _projection(fields))
+        if role:
+            # Without a role filter the planner's choice (the _id index) is already right
+            cursor = cursor.hint(_ROLE_ID_INDEX)
+        employees = await cursor.sort("_id", 1).skip(skip).limit(limit).to_list(limit)
+        return [User.from_mongo(emp) for emp in employees]
     except Exception as e:
-        logger.error(f"Error listing employees: {e}")
+        logger.error("Error listing employees: %s", e)
         raise
 
 async def add_employee(employee_data: Dict[str, Any]):
@@ -212,26 +416,25 @@ async def add_employee(employee_data: Dict[str, Any]):
     try:
         # Ensure password is hashed
         if 'password' in employee_data:
-            employee_data['password'] = bcrypt.hashpw(employee_data['password'].encode(), bcrypt.gensalt())
+            employee_data['password'] = await _hash_password(employee_data['password'])
         
-        result = await db.users.insert_one(employee_data)
-        return str(result.inserted_id)
+        return await _insert_user(employee_data)
     except Exception as e:
-        logger.error(f"Error adding employee: {e}")
+        logger.error("Error adding employee: %s", e)
         raise
 
-async def update_employee(employee_id: str, update_data: Dict[str, Any]):
+async def update_employee(employee_id: Union[str, ObjectId], update_data: Dict[str, Any]):
     """
     Update employee information
     """
     try:
         result = await db.users.update_one(
-            {"_id": ObjectId(employee_id)},
+            {"_id": _oid(employee_id)},
             {"$set": update_data}
         )
         return result.modified_count > 0
     except Exception as e:
-        logger.error(f"Error updating employee: {e}")
+        logger.error("Error updating employee: %s", e)
         raise
 
 # 5. Transactions Management Services
@@ -243,50 +446,67 @@ async def create_transaction(transaction_data: Dict[str, Any]):
         result = await db.transactions.insert_one(transaction_data)
         return str(result.inserted_id)
     except Exception as e:
-        logger.error(f"Error creating transaction: {e}")
+        logger.error("Error creating transaction: %s", e)
         raise
 
+@_ttl_cache(ttl=300)
 async def get_financial_summary():
     """
     Retrieve comprehensive financial summary
     """
     try:
-        # Aggregate total income and expenses
-        financial_summary = await db.transactions.aggregate([
-            {
-                "$group": {
-                    "_id": None,
-                    "total_income": {"$sum": {"$cond": [{"$eq": ["$transaction_type", "income"]}, "$amount", 0]}},
-                    "total_expenses": {"$sum": {"$cond": [{"$eq": ["$transaction_type", "expense"]}, "$amount", 0]}}
-                }
-            }
-        ]).to_list(1)
+        # Aggregate total income and expenses: one indexed $match per type, run concurrently,
+        # instead of a $cond evaluated against every transaction
+        income, expenses = await asyncio.gather(
+            _sum_amount("income"),
+            _sum_amount("expense")
+        )
         
-        return financial_summary[0] if financial_summary else {"total_income": 0, "total_expenses": 0}
+        return {"total_income": income, "total_expenses": expenses}
     except Exception as e:
-        logger.error(f"Error retrieving financial summary: {e}")
+        logger.error("Error retrieving financial summary: %s", e)
         raise
 
+# Shared create/update/delete handlers behind the manage_* services
+async def _crud_create(collection, data: Dict[str, Any]):
+    result = await collection.insert_one(data)
+    return str(result.inserted_id)
+
+async def _crud_update(collection, data: Dict[str, Any]):
+    result = await collection.update_one(
+        {"_id": _oid(data['id'])},
+        {"$set": data}
+    )
+    return result.modified_count > 0
+
+async def _crud_delete(collection, data: Dict[str, Any]):
+    result = await collection.delete_one({"_id": _oid(data['id'])})
+    return result.deleted_count > 0
+
+_CRUD_ACTIONS = {
+    "create": _crud_create,
+    "update": _crud_update,
+    "delete": _crud_delete,
+}
+
+async def _manage(collection, action: str, data: Dict[str, Any]):
+    """
+    Dispatch a manage_* action to its handler with one dict lookup
+    """
+    handler = _CRUD_ACTIONS.get(action)
+    if handler is None:
+        raise ValueError(f"Invalid action. Must be one of: {list(_CRUD_ACTIONS)}")
+    return await handler(collection, data)
+
 # 6. Inventory Management Services
 async def manage_inventory_item(action: str, item_data: Dict[str, Any]):
     """
     Manage inventory items (create, update, delete)
     """
     try:
-        if action == "create":
-            result = await db.inventory.insert_one(item_data)
-            return str(result.inserted_id)
-        elif action == "update":
-            result = await db.inventory.update_one(
-                {"_id": ObjectId(item_data['id'])},
-                {"$set": item_data}
-            )
-            return result.modified_count > 0
-        elif action == "delete":
-            result = await db.inventory.delete_one({"_id": ObjectId(item_data['id'])})
-            return result.deleted_count > 0
+        return await _manage(db.inventory, action, item_data)
     except Exception as e:
-        logger.error(f"Error managing inventory: {e}")
+        logger.error("Error managing inventory: %s", e)
         raise
 
 # 7. E-Library Management Services
@@ -295,20 +515,9 @@ async def manage_book(action: str, book_data: Dict[str, Any]):
     Manage e-library books
     """
     try:
-        if action == "create":
-            result = await db.books.insert_one(book_data)
-            return str(result.inserted_id)
-        elif action == "update":
-            result = await db.books.update_one(
-                {"_id": ObjectId(book_data['id'])},
-                {"$set": book_data}
-            )
-            return result.modified_count > 0
-        elif action == "delete":
-            result = await db.books.delete_one({"_id": ObjectId(book_data['id'])})
-            return result.deleted_count > 0
+        return await _manage(db.books, action, book_data)
     except Exception as e:
-        logger.error(f"Error managing book: {e}")
+        logger.error("Error managing book: %s", e)
         raise
 
 # 8. Messaging Services
@@ -324,7 +533,7 @@ async def send_mass_message(message_data: Dict[str, Any]):
         # This is a placeholder for actual message sending logic
         return str(result.inserted_id)
     except Exception as e:
-        logger.error(f"Error sending mass message: {e}")
+        logger.error("Error sending mass message: %s", e)
         raise
 
 # 9. Transportation Management Services
@@ -333,20 +542,9 @@ async def manage_bus(action: str, bus_data: Dict[str, Any]):
     Manage school buses
     """
     try:
-        if action == "create":
-            result = await db.buses.insert_one(bus_data)
-            return str(result.inserted_id)
-        elif action == "update":
-            result = await db.buses.update_one(
-                {"_id": ObjectId(bus_data['id'])},
-                {"$set": bus_data}
-            )
-            return result.modified_count > 0
-        elif action == "delete":
-            result = await db.buses.delete_one({"_id": ObjectId(bus_data['id'])})
-            return result.deleted_count > 0
+        return await _manage(db.buses, action, bus_data)
     except Exception as e:
-        logger.error(f"Error managing bus: {e}")
+        logger.error("Error managing bus: %s", e)
         raise
 
 # 10. Academics Management Services
@@ -355,20 +553,9 @@ async def manage_course(action: str, course_data: Dict[str, Any]):
     Manage academic courses
     """
     try:
-        if action == "create":
-            result = await db.courses.insert_one(course_data)
-            return str(result.inserted_id)
-        elif action == "update":
-            result = await db.courses.update_one(
-                {"_id": ObjectId(course_data['id'])},
-                {"$set": course_data}
-            )
-            return result.modified_count > 0
-        elif action == "delete":
-            result = await db.courses.delete_one({"_id": ObjectId(course_data['id'])})
-            return result.deleted_count > 0
+        return await _manage(db.courses, action, course_data)
     except Exception as e:
-        logger.error(f"Error managing course: {e}")
+        logger.error("Error managing course: %s", e)
         raise
 
 # 11. System Logging Services
@@ -380,7 +567,7 @@ async def log_system_event(log_data: Dict[str, Any]):
         result = await db.system_logs.insert_one(log_data)
         return str(result.inserted_id)
     except Exception as e:
-        logger.error(f"Error logging system event: {e}")
+        logger.error("Error logging system event: %s", e)
         raise
 
 # 12. System Settings Services
@@ -396,104 +583,103 @@ async def update_system_settings(settings_data: Dict[str, Any]):
         )
         return result.modified_count > 0
     except Exception as e:
-        logger.error(f"Error updating system settings: {e}")
+        logger.error("Error updating system settings: %s", e)
         raise
 
 # 13. Logout Services
-async def handle_user_logout(user_id: str):
+async def handle_user_logout(user_id: Union[str, ObjectId]):
     """
     Handle user logout
     """
     try:
         logout_record = {
-            "user_id": ObjectId(user_id),
-            "logout_time": datetime.utcnow()
+            "user_id": _oid(user_id),
+            "logout_time": datetime.now(timezone.utc)
         }
         result = await db.logout_logs.insert_one(logout_record)
         return str(result.inserted_id)
     except Exception as e:
-        logger.error(f"Error handling user logout: {e}")
+        logger.error("Error handling user logout: %s", e)
         raise
 
 # 14. Profile Management Services
-async def update_user_profile(user_id: str, profile_data: Dict[str, Any]):
+async def update_user_profile(user_id: Union[str, ObjectId], profile_data: Dict[str, Any]):
     """
     Update user profile settings
     """
     try:
         result = await db.users.update_one(
-            {"_id": ObjectId(user_id)},
+            {"_id": _oid(user_id)},
             {"$set": profile_data}
         )
         return result.modified_count > 0
     except Exception as e:
-        logger.error(f"Error updating user profile: {e}")
+        logger.error("Error updating user profile: %s", e)
         raise
 
 
+_REQUIRED_USER_FIELDS = ('username', 'password', 'email', 'role')
+_VALID_ROLES = frozenset(r.value for r in UserRole)
+_EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+def _validate_user(user_data: Dict[str, Any]):
+    """
+    Check required fields, role and email format of a registration payload; raises ValueError
+    """
+    # Validate required fields
+    for field in _REQUIRED_USER_FIELDS:
+        if field not in user_data:
+            raise ValueError(f"Missing required field: {field}")
+    
+    # Validate role
+    if user_data['role'] not in _VALID_ROLES:
+        raise ValueError(f"Invalid user role. Must be one of: {[r.value for r in UserRole]}")
+    
+    # Validate email format
+    if not _EMAIL_RE.match(user_data['email']):
+        raise ValueError("Invalid email format")
+
 async def create_user(user_data: Dict[str, Any]):
     """
     Create a new user with role-based registration
     Required fields: username, password, email, role
     """
     try:
-        # Validate required fields
-        required_fields = ['username', 'password', 'email', 'role']
-        for field in required_fields:
-            if field not in user_data:
-                raise ValueError(f"Missing required field: {field}")
-        
-        # Validate role
-        if user_data['role'] not in [r.value for r in UserRole]:
-            raise ValueError(f"Invalid user role. Must be one of: {[r.value for r in UserRole]}")
-        
-        # Validate email format
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", user_data['email']):
-            raise ValueError("Invalid email format")
-        
-        # Check if username or email already exists
-        existing_user = await db.users.find_one({
-            '$or': [
-                {'username': user_data['username']},
-                {'email': user_data['email']}
-            ]
-        })
-        if existing_user:
-            raise ValueError("Username or email already exists")
+        _validate_user(user_data)
         
         # Hash password
-        hashed_password = bcrypt.hashpw(user_data['password'].encode(), bcrypt.gensalt())
+        hashed_password = await _hash_password(user_data['password'])
         
-        # Create user document
+        # Create user document; both timestamps share one clock read
+        now = datetime.now(timezone.utc)
         user_doc = {
             'username': user_data['username'],
             'email': user_data['email'],
             'password': hashed_password,
             'role': user_data['role'],
             'is_active': True,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
         
         # Insert user
-        result = await db.users.insert_one(user_doc)
-        return str(result.inserted_id)
+        return await _insert_user(user_doc)
         
     except ValueError as ve:
-        logger.error(f"Validation error creating user: {ve}")
+        logger.error("Validation error creating user: %s", ve)
         raise
     except Exception as e:
-        logger.error(f"Error creating user: {e}")
+        logger.error("Error creating user: %s", e)
         raise
 
 
-async def generate_access_token(user_id: str, role: str):
+def generate_access_token(user_id: str, role: str):
     """
     Generate JWT access token
     """
     try:
         # Token expiration
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         
         # Payload with user details
         to_encode = {
@@ -503,19 +689,24 @@ async def generate_access_token(user_id: str, role: str):
         }
         
         # Encode token
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = jwt.encode(to_encode, _JWT_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     except Exception as e:
-        logger.error(f"Error generating token: {e}")
+        logger.error("Error generating token: %s", e)
         raise
 
-async def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
+def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Verify JWT access token
     """
+    payload = _VERIFY_CACHE.get(token)
+    # A cached payload is only reused while the token itself is still unexpired
+    if payload is not None and payload["exp"] > time.time():
+        return payload
     try:
         # Decode token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS, options=_JWT_DECODE_OPTIONS)
+        _VERIFY_CACHE[token] = payload
         return payload
     except jwt.ExpiredSignatureError:
         logger.error("Token has expired")
@@ -524,46 +715,60 @@ async def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
         logger.error("Invalid token")
         return None
 
-async def get_user_by_id(user_id: str):
+async def get_user_by_id(user_id: Union[str, ObjectId]):
     """
     Retrieve user by ID
     """
     try:
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
-        return User(**user) if user else None
+        user = await db.users.find_one({"_id": _oid(user_id)}, USER_PROJECTION)
+        return User.from_mongo(user) if user else None
     except Exception as e:
-        logger.error(f"Error retrieving user: {e}")
+        logger.error("Error retrieving user: %s", e)
         raise
 
-async def list_users_by_role(role: UserRole, skip: int = 0, limit: int = 100):
+@_ttl_cache(ttl=60)
+async def list_users_by_role(
+    role: UserRole,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[Tuple[str, ...]] = None,
+    after_id: Optional[str] = None
+):
     """
-    List users by specific role
+    List users by specific role, with optional projection and `_id`-range pagination.
+    `fields` must be a tuple since the arguments double as the cache key.
     """
     try:
-        users = await db.users.find({"role": role.value}).skip(skip).limit(limit).to_list(limit)
-        return [User(**user) for user in users]
+        query = _page_query({"role": role.value}, after_id)
+        users = await db.users.find(query, _projection(fields)).hint(_ROLE_ID_INDEX).sort("_id", 1).skip(skip).limit(limit).to_list(limit)
+        return [User.from_mongo(user) for user in users]
     except Exception as e:
-        logger.error(f"Error listing users by role: {e}")
+        logger.error("Error listing users by role: %s", e)
         raise
 
 # Update the existing authenticate_user function
+# Only what login needs: the hash to check and the fields behind the token and response
+_LOGIN_PROJECTION = {"_id": 1, "password": 1, "username": 1, "email": 1, "role": 1, "is_active": 1}
+
 async def authenticate_user(username: str, password: str):
     """
     Enhanced user authentication with token generation
     """
     try:
-        user = await db.users.find_one({"username": username})
-        if user and bcrypt.checkpw(password.encode(), user['password']):
+        user = await db.users.find_one({"username": username}, _LOGIN_PROJECTION)
+        # The hash is only needed for the check; it is popped so it never reaches the returned User
+        stored_hash = user.pop('password', None) if user else None
+        if stored_hash and await _verify_password(stored_hash, password):
             # Generate access token
-            user_obj = User(**user)
-            token = await generate_access_token(str(user_obj.id), user_obj.role)
+            user_obj = User.from_mongo(user)
+            token = generate_access_token(str(user_obj.id), user_obj.role)
             return {
                 "user": user_obj,
                 "access_token": token
             }
         return None
     except Exception as e:
-        logger.error(f"Error logging in user: {e}")
+        logger.error("Error logging in user: %s", e)
         raise
 
     
\ No newline at end of file